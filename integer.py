@@ -1,330 +1,450 @@
 """
-This module demonstrates a p-adic arithmetic model without consuming the original
-digit generators. Instead, each Integer_P_Adic holds a 'digit_factory' that can produce a fresh
-identical infinite generator of digits each time it is called. This allows us to
-perform multiple operations on the same Integer_P_Adic number without losing the original data.
-
-We test field axioms and properties similar to before, but now we ensure reproducibility
-and no unwanted consumption of generators.
+This module demonstrates a p-adic arithmetic model on a fixed window of digits.
+Each Integer_P_Adic holds a NumPy uint8 array with its first P_GITS base-p digits
+(least significant first), or a bytearray when NumPy is not installed. Arithmetic
+is exact modulo p**P_GITS, which is all we ever display or compare, so every
+operation works on whole arrays instead of chains of generators.
+
+We test field axioms and properties similar to before; since the digits are held
+read-only, the same Integer_P_Adic can take part in many operations.
 """
 
+import collections
+import functools
 import random
 from math import gcd
-import itertools
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 DEFAULT_PRIME_BASE = 3
 DEFAULT_MAX_P_GITS = 20
+GUARD_P_GITS = 1
+P_GITS = DEFAULT_MAX_P_GITS + GUARD_P_GITS
+KARATSUBA_THRESHOLD = 64
+MAX_PRIME_BASE = 256  # digits are stored as uint8
 
-def stable_p_adic(p=DEFAULT_PRIME_BASE, seed=None):
+def _new_digits(n=P_GITS):
+    """
+    A zeroed buffer of n digits: a uint8 NumPy array, or a bytearray without NumPy.
+    """
+    if np is None:
+        return bytearray(n)
+    return np.zeros(n, dtype=np.uint8)
+
+def _read_only(digits):
     """
-    Create a stable p-adic number. We generate 'length' digits first and then yield zeros.
-    A factory function returns this same sequence every time it's called, allowing
-    for infinite cloning without consumption issues.
+    Make a digit buffer read-only. Every Integer_P_Adic holds its digits this way,
+    since it caches values computed from them and may share them with others.
     """
+    if np is None:
+        return bytes(digits)
+    digits.setflags(write=False)
+    return digits
 
-    def digit_factory():
-        def gen():
-            rng = random.Random(seed)
-            while True:
-                d = rng.randint(0, p-1)
-                yield d
-        return gen()
-    return Integer_P_Adic(p, digit_factory)
+def _copy_digits(digits):
+    """
+    A fresh digit buffer with the same digits, from any sequence of them.
+    """
+    if np is None:
+        return bytes(digits)
+    return np.array(digits, dtype=np.uint8)
+
+def stable_p_adic(p=DEFAULT_PRIME_BASE, seed=None):
+    """
+    Create a stable p-adic number. The digits are drawn once from a generator
+    seeded with 'seed', so the same seed always gives the same number.
+    """
+    rng = random.Random(seed)
+    digits = [rng.randrange(p) for _ in range(P_GITS)]
+    return Integer_P_Adic(p, digits)
 
 def p_adic_equal(x, y, num_digits=DEFAULT_MAX_P_GITS):
     """
-    Compare the first num_digits of x and y for equality by fetching fresh generators.
-    """
-    xg = x.digit_factory()
-    yg = y.digit_factory()
-    combined = itertools.zip_longest(xg, yg, fillvalue=0)
-    for _ in range(num_digits):
-        try:
-            dx,dy = next(combined)
-        except:
-            return True
-        else:
-            if dx != dy:
-                return False
-    
-    return True
+    Compare the first num_digits of x and y for equality.
+    """
+    return bool(_pequal(x.digits[:num_digits], y.digits[:num_digits]))
 
+@functools.lru_cache(maxsize=None)
 def p_adic_zero(p=DEFAULT_PRIME_BASE):
-    def digit_factory():
-        def gen():
-            yield 0
-        return gen()
-    return Integer_P_Adic(p, digit_factory)
+    """
+    The p-adic zero. There is one shared instance per p, with read-only digits.
+    """
+    return Integer_P_Adic(p, [0] * P_GITS)
 
+@functools.lru_cache(maxsize=None)
 def p_adic_one(p=DEFAULT_PRIME_BASE):
-    def digit_factory():
-        def gen():
-            yield 1
-        return gen()
-    return Integer_P_Adic(p, digit_factory)
-
-def extended_gcd(a, b):
     """
-    Extended Euclidean Algorithm.
-    Returns (g, x, y) such that a*x + b*y = g = gcd(a,b).
+    The p-adic one. There is one shared instance per p, with read-only digits.
     """
-    if b == 0:
-        return (a, 1, 0)
-    else:
-        g, x1, y1 = extended_gcd(b, a % b)
-        return (g, y1, x1 - (a // b)*y1)
+    return Integer_P_Adic(p, [1] + [0] * (P_GITS - 1))
 
 def mod_inverse(x, p=DEFAULT_PRIME_BASE):
     """
-    Compute inverse of x modulo p using extended Euclidean algorithm.
+    Compute inverse of x modulo p with the built-in pow(x, -1, p).
     """
-    g, a, b = extended_gcd(x, p)
-    if g != 1:
+    if gcd(x, p) != 1:
         raise ValueError("No inverse, not coprime.")
-    return a % p
+    return pow(x, -1, p)
 
 def p_adic_from_integer(n: int, p=DEFAULT_PRIME_BASE):
-    def number_generator():
-        def gen():
-            r = n
-            while r > 0:
-                yield r % p
-                r = r // p
+    """
+    Expand n into its first P_GITS base-p digits. Negative n wraps around to
+    its p-adic complement, e.g. -1 is ...(p-1)(p-1)(p-1).
+    """
+    digits = []
+    r = n
+    for i in range(P_GITS):
+        digits.append(r % p)
+        r = r // p
+
+    return Integer_P_Adic(p, digits)
+
+# The arithmetic kernels below are scalar loops over digit buffers, which Numba
+# compiles to tight machine loops. Without Numba they still run, just as plain
+# Python, over uint8 arrays or bytearrays alike.
+try:
+    from numba import njit, prange
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+    prange = range
+
+if np is None:
+    def _new_col(n):
+        return [0] * n
+else:
+    @njit(cache=True)
+    def _new_col(n):
+        return np.zeros(n, dtype=np.int64)
+
+@njit(cache=True)
+def _padd(x, y, p, out):
+    """
+    Add two digit arrays into out, rippling the carry from the least significant digit up.
+
+    Each digit sum is below 2p, so a compare and subtract replaces % and //.
+    """
+    carry = 0
+    for i in range(len(out)):
+        s = int(x[i]) + int(y[i]) + carry
+        carry = 1 if s >= p else 0
+        out[i] = s - p * carry
+
+@njit(cache=True)
+def _pneg(x, p, out):
+    """
+    Write the additive inverse of x into out, i.e. ~x + 1 in a single pass.
+    """
+    carry = 1
+    for i in range(len(out)):
+        s = p - 1 - int(x[i]) + carry
+        carry = 1 if s >= p else 0
+        out[i] = s - p * carry
+
+@njit(cache=True)
+def _pcarry(col, p, out):
+    """
+    Turn column sums of a product into digits, with a single carry sweep.
+
+    This is the only place a product divides by p: the columns are summed without
+    reducing, which int64 affords since each is at most P_GITS * (p-1)**2 plus a
+    carry of the same size. One division per digit gives both carry and digit.
+    """
+    carry = 0
+    for k in range(len(out)):
+        t = col[k] + carry
+        carry = t // p
+        out[k] = t - carry * p
+
+@njit(cache=True)
+def _pmul(x, y, p, out):
+    """
+    Multiply two digit arrays into out, truncating the product to len(out) digits.
+
+    The column sums t_k = sum_{ℓ=0}^{k} x_ℓ y_{k-ℓ} are accumulated row by row,
+    each digit x_i adding into the columns it reaches below len(out) only, and
+    zero digits are skipped. The carries are resolved afterwards by _pcarry.
+
+    x may be shorter than out, e.g. the digits of a small integer, in which case
+    only its own rows are accumulated.
+    """
+    n = len(out)
+    col = _new_col(n)
+    for i in range(min(len(x), n)):
+        xi = int(x[i])
+        if xi != 0:
+            for j in range(n - i):
+                col[i + j] += xi * int(y[j])
+    _pcarry(col, p, out)
+
+def _int_digits(m, p):
+    """
+    The base-p digits of a non-negative integer m, at most P_GITS of them.
+    """
+    digits = []
+    while m > 0 and len(digits) < P_GITS:
+        m, d = divmod(m, p)
+        digits.append(d)
+    buf = _new_digits(len(digits))
+    buf[:] = digits
+    return buf
+
+def _karatsuba(x, y):
+    """
+    Column sums of the product of two equally long int64 digit arrays, i.e. their
+    full convolution, using Karatsuba's three half-size products.
+    """
+    n = len(x)
+    if n < KARATSUBA_THRESHOLD:
+        return np.convolve(x, y)
+
+    h = n // 2
+    x0, x1 = x[:h], x[h:]
+    y0, y1 = y[:h], y[h:]
+
+    lo = _karatsuba(x0, y0)
+    hi = _karatsuba(x1, y1)
+
+    # (x0 + x1)(y0 + y1) - x0 y0 - x1 y1 = x0 y1 + x1 y0
+    sx = x1.copy()
+    sx[:h] += x0
+    sy = y1.copy()
+    sy[:h] += y0
+    mid = _karatsuba(sx, sy)
+    mid[:len(lo)] -= lo
+    mid -= hi
+
+    col = np.zeros(2*n - 1, dtype=np.int64)
+    col[:len(lo)] += lo
+    col[h:h + len(mid)] += mid
+    col[2*h:] += hi
+    return col
+
+@njit(cache=True)
+def _pinv(x, p, out):
+    """
+    Write the digit-wise complement p - d - 1 of x into out.
+    """
+    for i in range(len(out)):
+        out[i] = p - 1 - int(x[i])
+
+@njit(cache=True)
+def _pequal(x, y):
+    for i in range(len(x)):
+        if x[i] != y[i]:
+            return False
+    return True
+
+_Kernels = collections.namedtuple("_Kernels", "add neg mul carry")
+_KERNELS_BY_P = {}
 
-        return gen()
+def _kernels_for(p):
+    """
+    The digit kernels above with p fixed. Numba compiles the captured p in as a
+    constant, so the divisions by p in the carry loops are strength-reduced to
+    multiplications. Built on first use for each p, which is also where p is
+    checked to fit the uint8 digits.
+    """
+    kernels = _KERNELS_BY_P.get(p)
+    if kernels is None:
+        if not 2 <= p <= MAX_PRIME_BASE:
+            raise ValueError(f"Prime base must be between 2 and {MAX_PRIME_BASE}, got {p}.")
+
+        @njit(cache=True)
+        def add(x, y, out):
+            _padd(x, y, p, out)
+
+        @njit(cache=True)
+        def neg(x, out):
+            _pneg(x, p, out)
+
+        @njit(cache=True)
+        def mul(x, y, out):
+            _pmul(x, y, p, out)
+
+        @njit(cache=True)
+        def carry(col, out):
+            _pcarry(col, p, out)
+
+        kernels = _KERNELS_BY_P[p] = _Kernels(add, neg, mul, carry)
+    return kernels
+
+@njit(cache=True, parallel=True)
+def batched_padd(A, B, p):
+    """
+    Add two batches of digit arrays, shaped (batch, P_GITS), row by row. Needs NumPy.
+    """
+    out = np.empty_like(A)
+    for b in prange(A.shape[0]):
+        _padd(A[b], B[b], p, out[b])
+    return out
 
-    return Integer_P_Adic(p, number_generator)
+@njit(cache=True, parallel=True)
+def batched_pmul(A, B, p):
+    """
+    Multiply two batches of digit arrays, shaped (batch, P_GITS), row by row. Needs NumPy.
+    """
+    out = np.empty_like(A)
+    for b in prange(A.shape[0]):
+        _pmul(A[b], B[b], p, out[b])
+    return out
 
 class Integer_P_Adic:
     """
-    A p-adic number represented by a digit_factory that can produce identical
-    digit sequences each time it's called.
+    A p-adic number represented by its first P_GITS digits, stored least
+    significant first in a uint8 NumPy array (a bytearray without NumPy).
 
     We implement __add__, __mul__, and __str__.
 
-    The __str__ prints some leading digits in reverse order to mimic a p-adic style like "...3210".
+    The __str__ prints the digits in reverse order to mimic a p-adic style like "...3210".
     """
-    def __init__(self, p, digit_factory):
+    def __init__(self, p, digits, copy=True):
+        """
+        Wrap P_GITS digits of base p. Unless copy=False, the digits are copied
+        first, so the caller's buffer is neither frozen nor able to change this
+        number afterwards; copy=False is for fresh buffers nobody else holds.
+        """
         self.p = p
-        self.digit_factory = digit_factory  # A callable returning a fresh generator
+        self._kernels = _kernels_for(p)  # digit kernels specialized for p, checks p
+        if copy:
+            digits = _copy_digits(digits)
+        self.digits = _read_only(digits)  # P_GITS uint8 digits, see _new_digits
+        self._str = None  # cached __str__
+        self._neg_of = None  # the Integer_P_Adic this is known to be the negation of
 
     def copy(self):
-        copies = itertools.tee(self.digit_factory(), 1)
-        xg = copies[0]
-        p = self.p
-        def copy_generator():
-            def gen():
-                for x in xg:
-                    yield x
-            
-            return gen()
-                    
-        return Integer_P_Adic(p, copy_generator)
+        """
+        A new Integer_P_Adic with its own copy of the digits. Cached values and
+        negation links are not carried over.
+        """
+        return Integer_P_Adic(self.p, self.digits)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
 
     def __str__(self):
-        # Show 20 digits for representation:
-        #digits = [str(x) for x in list(itertools.islice(self.digit_factory(), 20))]
-        digits = []
-        prefix = ""
-        try:
-            for n, x in enumerate(self.digit_factory()):
-                if n > DEFAULT_MAX_P_GITS:
-                    prefix = "..."
-                    break
-                digits.append(str(x))
-        except:
-            prefix = ""
-
-        return prefix + "".join(digits[::-1]) + f" (base {self.p})"
+        if self._str is None:
+            digits = "".join(map(str, bytes(self.digits[::-1])))
+            self._str = "..." + digits + f" (base {self.p})"
+        return self._str
 
     def __lshift__(self, n):
         # self << n
         if n < 0:
             return self >> (-n)
-        
+
         if n == 0:
             return self
-        
-        xg = self.digit_factory()
-        p = self.p
+        if n >= P_GITS:
+            return p_adic_zero(self.p)
+
+        out = _new_digits()
+        out[n:] = self.digits[:P_GITS - n]
+        return Integer_P_Adic(self.p, out, copy=False)
 
-        def left_shift_factory():
-            def gen():
-                for _ in range(n):
-                    yield 0
-                
-                for x in xg:
-                    yield x
-                
-            return gen()
-
-        return Integer_P_Adic(p, left_shift_factory)
-        
     def __rshift__(self, n):
         # self >> n
         if n < 0:
             return self << (-n)
-        
-        xg = self.digit_factory()
-        p = self.p
-        
-
-        def right_shift_factory():
-            def gen():
-                m = n
-                for x in xg:
-                    if m > 0:
-                        m -= 1
-                    else:
-                        yield x
-                
-                yield 0
-                
-            return gen()
-
-        return Integer_P_Adic(p, right_shift_factory)
-    
+
+        if n == 0:
+            return self
+        if n >= P_GITS:
+            return p_adic_zero(self.p)
+
+        out = _new_digits()
+        out[:P_GITS - n] = self.digits[n:]
+        return Integer_P_Adic(self.p, out, copy=False)
+
     def __add__(self, other):
         if self.p != other.p:
             raise ValueError("Cannot add p-adics with different primes.")
 
-        p = self.p
-        xg = self.digit_factory()
-        yg = other.digit_factory()
-
-        def sum_factory():
-            carry = 0
-            def gen():
-                for dx, dy in itertools.zip_longest(xg, yg, fillvalue=0):
-                    s = dx + dy + carry
-                    digit = s % p
-                    carry = s // p
-                    yield digit
-            
-            return gen()
-    
-        return Integer_P_Adic(p, sum_factory)
-    
-    def __radd__(self, other):
-        if self.p != other.p:
-            raise ValueError("Cannot add p-adics with different primes.")
+        # x + (-x) is zero without looking at the digits
+        if other is self._neg_of:
+            return p_adic_zero(self.p)
 
-        p = self.p
-        xg = self.digit_factory()
-        yg = other.digit_factory()
-
-        def sum_factory():
-            def gen():
-                carry = 0
-                for dx, dy in itertools.zip_longest(xg, yg, fillvalue=0):
-                    s = dx + dy + carry
-                    digit = s % p
-                    carry = s // p
-                    yield digit
-                    
-            return gen()
-
-        self.digit_factory = sum_factory
+        out = _new_digits()
+        self._kernels.add(self.digits, other.digits, out)
+        return Integer_P_Adic(self.p, out, copy=False)
 
     def __mul__(self, other):
         p = self.p
-        
+
         if isinstance(other, int):
             if other == 0:
                 return p_adic_zero(p)
             if other < 0:
                 return (-self) * (-other)
-            if other > p:
-                return self * p_adic_from_integer(other, p)
-            
-            xg = self.digit_factory()
-
-            def prod_factory():
-                def gen():
-                    carry = 0
-                    for x in xg:
-                        s = carry + x * other
-                        digit = s % p
-                        carry = s // p
-                        yield digit
-                return gen()
-
-            return Integer_P_Adic(self.p, prod_factory)
-        
+
+            # One row per base-p digit of other, instead of a full p-adic product
+            out = _new_digits()
+            self._kernels.mul(_int_digits(other, p), self.digits, out)
+            return Integer_P_Adic(p, out, copy=False)
+
         if isinstance(other, Integer_P_Adic):
             if self.p != other.p:
                 raise ValueError("Cannot multiply p-adics with different primes.")
-            
-            def product_factory():
-                def gen():
-                    # c_{-1}=0
-                    carry = 0
-                    # We'll produce digits d_k for k = 0,1,2,...
-                    x_digits = []
-                    y_digits = []
-                    # For each k, we need x_0..x_k and y_0..y_k
-                    k = 0
-                    while True:
-                        # Ensure we have at least k+1 digits from each
-                        while len(x_digits) <= k:
-                            try:
-                                x_digits.append(next(xg))
-                            except StopIteration:
-                                # If x digits end, we can still proceed if infinite zeros are implied
-                                x_digits.append(0)
-
-                        while len(y_digits) <= k:
-                            try:
-                                y_digits.append(next(yg))
-                            except StopIteration:
-                                # If y digits end, append zeros
-                                y_digits.append(0)
-
-                        # Compute t_k
-                        # t_k = carry + sum_{ℓ=0}^{k} x_ℓ y_{k-ℓ}
-                        # Let's do a simple sum:
-                        t_k = carry
-                        # sum pairs: 
-                        # We'll sum over ℓ=0..k: x_ℓ * y_{k-ℓ}
-                        # This is O(k) per step:
-                        partial_sum = 0
-                        for ℓ in range(k+1):
-                            partial_sum += x_digits[ℓ] * y_digits[k - ℓ]
-                        t_k += partial_sum
-
-                        # d_k and new carry
-                        d_k = t_k % p
-                        carry = t_k // p
-
-                        yield d_k
-                        k += 1
-
-                return gen()
-
-            return Integer_P_Adic(p, product_factory)
-        
+
+            out = _new_digits()
+            if P_GITS < KARATSUBA_THRESHOLD or np is None:
+                self._kernels.mul(self.digits, other.digits, out)
+            else:
+                col = _karatsuba(self.digits.astype(np.int64), other.digits.astype(np.int64))
+                self._kernels.carry(col, out)
+            return Integer_P_Adic(p, out, copy=False)
 
         raise ValueError(f"Cannot multiply PAddic number by {type(other)}")
 
     def __invert__(self):
-        p = self.p
-        def digit_factory():
-            # For negation, we read from x a fresh generator and negate each digit
-            base_g = self.digit_factory()
-            def gen():
-                for d in base_g:
-                    yield p - d - 1
-            return gen()
-        return Integer_P_Adic(p, digit_factory)
-    
+        # Each digit d becomes p - d - 1
+        out = _new_digits()
+        _pinv(self.digits, self.p, out)
+        return Integer_P_Adic(self.p, out, copy=False)
+
     def __eq__(self, other):
         return p_adic_equal(self, other)
-    
+
     def __ne__(self, other):
-        return not p_adic_equal(self, other, 1000)
+        return not p_adic_equal(self, other)
 
     def __neg__(self):
-        return ~self + p_adic_one(self.p)
-    
-    def to_base(q: int):
-        p = self.p
+        if self._neg_of is not None:
+            return self._neg_of
+
+        out = _new_digits()
+        self._kernels.neg(self.digits, out)
+        result = Integer_P_Adic(self.p, out, copy=False)
+        # Remember the pair, so -(-x) and x + (-x) need no digit work
+        result._neg_of = self
+        self._neg_of = result
+        return result
+
+    def to_base(self, q: int):
+        """
+        The base-q digits, least significant first, of the integer in
+        [0, p**P_GITS) that the stored digits spell out. An infinite p-adic
+        expansion has no finite base-q form, so this is only its residue
+        modulo p**P_GITS.
+        """
+        if q < 2:
+            raise ValueError("Base must be at least 2.")
+
+        value = 0
+        for d in reversed(bytes(self.digits)):
+            value = value * self.p + d
+
+        digits = []
+        while value > 0:
+            value, d = divmod(value, q)
+            digits.append(d)
+        return digits
@@ -1,4 +1,13 @@
+import random
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from integer import *
+from integer import _karatsuba
 
 def is_addition_commutative(x,y):
     is_commutative = x+y == y+x
@@ -51,18 +60,80 @@ def is_multiplication_associative(x,y,z):
     
     return is_associative
 
-def test_field_axioms(p=5, tests=1000):
+def test_addition_carry(p=5, tests=1000):
+    """
+    Check that addition carries between digits, by comparing the p-adic sum of two
+    integers with the expansion of their integer sum.
+    """
+    rng = random.Random(0)
+    for test_i in range(tests):
+        a = rng.randrange(p**DEFAULT_MAX_P_GITS)
+        b = rng.randrange(p**DEFAULT_MAX_P_GITS)
+        x = p_adic_from_integer(a, p)
+        y = p_adic_from_integer(b, p)
+        if x + y != p_adic_from_integer(a + b, p):
+            print(f"Addition carry broke for {a} + {b}!")
+            print(f"{x} + {y} == {x+y}")
+            return
+
+    print(f"All carry tests passed for all {tests} tests and p = {p}.")
+
+def test_negation(p=5, tests=1000):
+    """
+    Check negation against the expansion of the negated integer.
+    """
+    rng = random.Random(2)
+    for test_i in range(tests):
+        a = rng.randrange(p**DEFAULT_MAX_P_GITS)
+        x = p_adic_from_integer(a, p)
+        if -x != p_adic_from_integer(-a, p):
+            print(f"Negation broke for {a}!")
+            print(f"-{x} == {-x}")
+            return
+
+    print(f"All negation tests passed for all {tests} tests and p = {p}.")
+
+def test_to_base(p=5, tests=1000):
+    """
+    Check that to_base recovers the base-q digits of integers below p**P_GITS.
+    """
+    rng = random.Random(1)
+    for test_i in range(tests):
+        n = rng.randrange(p**P_GITS)
+        q = rng.randrange(2, 17)
+        expected = []
+        r = n
+        while r > 0:
+            r, d = divmod(r, q)
+            expected.append(d)
+        if p_adic_from_integer(n, p).to_base(q) != expected:
+            print(f"to_base({q}) broke for {n} in base {p}!")
+            return
+
+    for q in [-2, 0, 1]:
+        try:
+            p_adic_one(p).to_base(q)
+        except ValueError:
+            pass
+        else:
+            print(f"to_base({q}) did not reject its base!")
+            return
+
+    print(f"All to_base tests passed for all {tests} tests and p = {p}.")
+
+def test_field_axioms(p=5, tests=1000, verbose=False):
     """
     Run tests of field-like properties for p-adic arithmetic using stable_p_adic.
-    Because we now have a digit_factory that does not consume the original data,
-    we can perform multiple operations on the same objects safely.
+    Because the digits are held read-only, we can perform multiple operations
+    on the same objects safely.
 
     We test:
     - Addition: commutativity, associativity, identity, inverses
     - Multiplication: commutativity, identity, distributivity
     - Inverse for units
 
-    If any property fails, we stop early and print an error.
+    If any property fails, we stop early and print an error. With verbose=True,
+    x, y and z are printed for every test as well.
     """
     zero = p_adic_zero(p)
     one = p_adic_one(p)
@@ -74,11 +145,12 @@ def test_field_axioms(p=5, tests=1000):
         z_seed = test_i*3 + 3
 
         x = stable_p_adic(p, x_seed)
-        print(f"x_{test_i} = {x}")
         y = stable_p_adic(p, y_seed)
-        print(f"y_{test_i} = {y}")
         z = stable_p_adic(p, z_seed)
-        print(f"z_{test_i} = {z}")
+        if verbose:
+            print(f"x_{test_i} = {x}")
+            print(f"y_{test_i} = {y}")
+            print(f"z_{test_i} = {z}")
 
         if not is_addition_commutative(x,y):
             return
@@ -89,10 +161,11 @@ def test_field_axioms(p=5, tests=1000):
         if not is_addtion_neutral(x, zero):
             return
 
-        # x+(-x)=0
-        if -x + x != zero:
+        # x+(-x)=0, adding a copy so the digits of -x are actually summed
+        # instead of short-circuiting through the negation link
+        if -x + x.copy() != zero:
             print(f"Additive inverse failed!")
-            print(f"{-x} + {x} == {-x + x}")
+            print(f"{-x} + {x} == {-x + x.copy()}")
             return
 
         if not is_multiplication_commutative(x,y):
@@ -114,7 +187,77 @@ def test_field_axioms(p=5, tests=1000):
 
     print(f"All field tests passed for all {tests} tests and p = {p}.")
 
+def test_field_axioms_batched(p=5, tests=1000):
+    """
+    The ring axioms of test_field_axioms, checked on whole batches of digit arrays
+    with batched_padd and batched_pmul instead of one Integer_P_Adic at a time.
+    """
+    X, Y, Z = np.random.default_rng(p).integers(0, p, size=(3, tests, P_GITS), dtype=np.uint8)
+    zero = np.zeros_like(X)
+    one = np.zeros_like(X)
+    one[:, 0] = 1
+    minus_one = np.full_like(X, p - 1)
+
+    def equal(A, B):
+        return np.array_equal(A[:, :DEFAULT_MAX_P_GITS], B[:, :DEFAULT_MAX_P_GITS])
+
+    def add(A, B):
+        return batched_padd(A, B, p)
+
+    def mul(A, B):
+        return batched_pmul(A, B, p)
+
+    checks = [
+        ("Commutativity of addition", add(X, Y), add(Y, X)),
+        ("Associativity of addition", add(add(X, Y), Z), add(X, add(Y, Z))),
+        ("Neutrality of zero", add(X, zero), X),
+        ("Additive inverse", add(mul(X, minus_one), X), zero),
+        ("Commutativity of multiplication", mul(X, Y), mul(Y, X)),
+        ("Associativity of multiplication", mul(mul(X, Y), Z), mul(X, mul(Y, Z))),
+        ("Multiplicative identity", mul(X, one), X),
+        ("Distributivity", mul(X, add(Y, Z)), add(mul(X, Y), mul(X, Z))),
+    ]
+    for name, lhs, rhs in checks:
+        if not equal(lhs, rhs):
+            print(f"{name} broke in the batched tests!")
+            return
+
+    # The batched kernels must agree with Integer_P_Adic arithmetic
+    XY_sum = add(X, Y)
+    XY_prod = mul(X, Y)
+    for test_i in range(min(tests, 10)):
+        x = Integer_P_Adic(p, X[test_i])
+        y = Integer_P_Adic(p, Y[test_i])
+        if not (np.array_equal(XY_sum[test_i], (x + y).digits)
+                and np.array_equal(XY_prod[test_i], (x * y).digits)):
+            print(f"Batched arithmetic disagrees with {x} and {y}!")
+            return
+
+    print(f"All batched field tests passed for all {tests} tests and p = {p}.")
+
+def test_karatsuba(p=5):
+    """
+    Check _karatsuba against np.convolve on windows long enough to recurse, since
+    P_GITS itself stays below KARATSUBA_THRESHOLD.
+    """
+    rng = np.random.default_rng(p)
+    for n in range(KARATSUBA_THRESHOLD, 3*KARATSUBA_THRESHOLD + 2):
+        x = rng.integers(0, p, size=n).astype(np.int64)
+        y = rng.integers(0, p, size=n).astype(np.int64)
+        if not np.array_equal(_karatsuba(x, y), np.convolve(x, y)):
+            print(f"Karatsuba disagrees with np.convolve for n = {n}!")
+            return
+
+    print(f"All Karatsuba tests passed for p = {p}.")
+
 if __name__ == "__main__":
+    verbose = "-v" in sys.argv[1:]
     for p in [3,5,7]:
-        test_field_axioms(p=p, tests=1000)
+        test_addition_carry(p=p, tests=1000)
+        test_negation(p=p, tests=1000)
+        test_to_base(p=p, tests=1000)
+        test_field_axioms(p=p, tests=1000, verbose=verbose)
+        if np is not None:
+            test_field_axioms_batched(p=p, tests=1000)
+            test_karatsuba(p=p)
  
\ No newline at end of file